@@ -0,0 +1,146 @@
+import threading
+
+import cv2
+import numpy as np
+
+# Per-thread cache of reusable output buffers, keyed by (shape, dtype, tag)
+_scratch = threading.local()
+
+def scratch_buffer(shape, dtype, tag=''):
+    """
+    Return a reusable per-thread array to pass as an OpenCV dst= output.
+
+    Batch runs over a directory of images otherwise allocate a fresh H x W
+    buffer per filter call; reusing one per call site keeps the allocator
+    and page faults out of the hot path. The tag keeps call sites whose
+    results are alive at the same time from sharing a buffer.
+    """
+    cache = getattr(_scratch, 'cache', None)
+    if cache is None:
+        cache = _scratch.cache = {}
+    key = (shape, np.dtype(dtype).str, tag)
+    buffer = cache.get(key)
+    if buffer is None:
+        buffer = cache[key] = np.empty(shape, dtype)
+    return buffer
+
+# Colour cycle matching skimage.color.label2rgb's defaults
+_LABEL_COLOURS = np.array([
+    (1.000, 0.000, 0.000),  # red
+    (0.000, 0.000, 1.000),  # blue
+    (1.000, 1.000, 0.000),  # yellow
+    (1.000, 0.000, 1.000),  # magenta
+    (0.000, 0.502, 0.000),  # green
+    (0.294, 0.000, 0.510),  # indigo
+    (1.000, 0.549, 0.000),  # darkorange
+    (0.000, 1.000, 1.000),  # cyan
+    (1.000, 0.753, 0.796),  # pink
+    (0.604, 0.804, 0.196),  # yellowgreen
+], dtype=np.float32)
+
+# Luma weights used by skimage.color.rgb2gray
+_GRAY_WEIGHTS = np.array([0.2125, 0.7154, 0.0721], dtype=np.float32)
+
+def fast_label2rgb(labels, image, alpha=0.3):
+    """
+    Colour-code labelled regions over a grayscale version of an image.
+
+    Vectorized replacement for skimage.color.label2rgb's overlay mode: the
+    per-label colours are assigned through a single look-up-table indexing
+    instead of looping over the regions in Python. Label 0 is treated as
+    background and left as plain grayscale.
+
+    Parameters:
+    -----------
+    labels : numpy.ndarray
+        Integer label image; 0 is treated as background
+    image : numpy.ndarray
+        uint8 RGB image the overlay is blended with
+    alpha : float, optional
+        Opacity of the overlay on labelled pixels
+
+    Returns:
+    --------
+    numpy.ndarray
+        float RGB visualization in [0, 1], background pixels grayscale
+    """
+    num_labels = int(labels.max())
+    lut = np.zeros((num_labels + 1, 3), dtype=np.float32)
+    if num_labels:
+        lut[1:] = _LABEL_COLOURS[np.arange(num_labels) % len(_LABEL_COLOURS)]
+
+    gray = (image.astype(np.float32) / 255.0) @ _GRAY_WEIGHTS
+    gray_rgb = gray[..., None].repeat(3, axis=2)
+
+    overlay = lut[labels]
+    foreground = (labels > 0)[..., None]
+    return np.where(foreground, alpha * overlay + (1.0 - alpha) * gray_rgb, gray_rgb)
+
+def _to_bgr_uint8(image):
+    """Normalize a panel image (gray/RGB, uint8 or float [0,1]) to BGR uint8."""
+    if image.dtype != np.uint8:
+        image = (np.clip(image, 0.0, 1.0) * 255).astype(np.uint8)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+def save_panel(path, panels, tile_size=(600, 500), footer=None, compression=3):
+    """
+    Save a grid of titled image panels as one PNG with OpenCV.
+
+    Lightweight replacement for the matplotlib subplot figures: each panel
+    is resized to a common tile size, topped with a title strip drawn by
+    cv2.putText, and the tiles are concatenated two per row and written
+    with cv2.imwrite, skipping matplotlib's figure/renderer machinery.
+
+    Parameters:
+    -----------
+    path : str
+        Destination PNG path
+    panels : list of (numpy.ndarray, str)
+        Image/title pairs; titles may contain newlines
+    tile_size : tuple of int, optional
+        (width, height) each panel is resized to
+    footer : str, optional
+        Summary line drawn in a strip underneath the grid
+    compression : int, optional
+        PNG compression level passed to cv2.imwrite
+
+    Returns:
+    --------
+    numpy.ndarray
+        The composed grid as uint8 RGB, so callers can reuse it in memory
+        instead of re-reading the PNG from disk
+    """
+    tile_w, tile_h = tile_size
+    tiles = []
+    for image, title in panels:
+        tile = cv2.resize(_to_bgr_uint8(image), (tile_w, tile_h),
+                          interpolation=cv2.INTER_AREA)
+        lines = title.split('\n')
+        strip = np.full((14 + 26 * len(lines), tile_w, 3), 255, np.uint8)
+        for i, line in enumerate(lines):
+            cv2.putText(strip, line, (10, 26 * (i + 1)), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.6, (0, 0, 0), 1, cv2.LINE_AA)
+        tiles.append(cv2.vconcat([strip, tile]))
+
+    # Pad title strips within each row to a common height before stacking
+    rows = []
+    for i in range(0, len(tiles), 2):
+        row = tiles[i:i + 2]
+        row_h = max(tile.shape[0] for tile in row)
+        row = [cv2.copyMakeBorder(tile, row_h - tile.shape[0], 0, 0, 0,
+                                  cv2.BORDER_CONSTANT, value=(255, 255, 255))
+               for tile in row]
+        rows.append(cv2.hconcat(row))
+
+    grid = cv2.vconcat(rows)
+    if footer:
+        # Plain putText on a fixed strip: no text-layout or bbox-measuring
+        # pass like matplotlib's figtext needed
+        strip = np.full((48, grid.shape[1], 3), 255, np.uint8)
+        cv2.putText(strip, footer, (30, 32), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.8, (0, 0, 0), 1, cv2.LINE_AA)
+        grid = cv2.vconcat([grid, strip])
+    cv2.imwrite(path, grid, [cv2.IMWRITE_PNG_COMPRESSION, compression])
+    return cv2.cvtColor(grid, cv2.COLOR_BGR2RGB)
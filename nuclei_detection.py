@@ -2,22 +2,35 @@ import os
 import sys
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
-from skimage import filters, morphology, measure, segmentation, color, feature
 
-def detect_nuclei(image_path, output_dir=None, visualize=True):
+from image_utils import fast_label2rgb, save_panel, scratch_buffer
+
+# Let OpenCV use all available cores for its SIMD/threaded primitives
+cv2.setUseOptimized(True)
+cv2.setNumThreads(os.cpu_count())
+
+# Structuring elements are constant across calls; rectangular SEs from
+# getStructuringElement hit OpenCV's fast morphology dispatch
+_K3 = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+
+# Neighbourhood for the local-maximum peak finder (min_distance of 7)
+_MIN_DISTANCE = 7
+_PEAK_KERNEL = cv2.getStructuringElement(
+    cv2.MORPH_RECT, (2 * _MIN_DISTANCE + 1, 2 * _MIN_DISTANCE + 1))
+
+def detect_nuclei(image_or_path, output_dir=None, visualize=True):
     """
     Detect and count nuclei in a fluorescence microscopy image.
-    
+
     Parameters:
     -----------
-    image_path : str
-        Path to the input image
+    image_or_path : str or numpy.ndarray
+        Path to the input image, or an already decoded RGB image array
     output_dir : str, optional
         Directory to save output images and results
     visualize : bool, optional
         Whether to create and save visualization
-        
+
     Returns:
     --------
     dict
@@ -25,97 +38,93 @@ def detect_nuclei(image_path, output_dir=None, visualize=True):
     """
     # Create output directory if it doesn't exist
     if output_dir is None:
-        output_dir = os.path.dirname(image_path)
-    
+        output_dir = os.path.dirname(image_or_path) if isinstance(image_or_path, str) else "results"
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
-    # Load the image
-    print(f"Loading image: {image_path}")
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Could not load image from {image_path}")
-    
-    # Convert from BGR to RGB for visualization
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # Load the image (or reuse an already decoded RGB array)
+    if isinstance(image_or_path, np.ndarray):
+        image_rgb = image_or_path
+    else:
+        print(f"Loading image: {image_or_path}")
+        image = cv2.imread(image_or_path)
+        if image is None:
+            raise ValueError(f"Could not load image from {image_or_path}")
+
+        # Convert from BGR to RGB for visualization
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     
     # Extract blue channel (nuclei)
     blue_channel = image_rgb[:, :, 2]  # In RGB, blue is channel 2
     
     # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(blue_channel, (5, 5), 0)
-    
-    # Apply Otsu's thresholding to segment nuclei
+    blurred = cv2.GaussianBlur(blue_channel, (5, 5), 0,
+                               dst=scratch_buffer(blue_channel.shape, np.uint8, 'blur'))
+    
+    # Apply Otsu's thresholding to segment nuclei. THRESH_BINARY + THRESH_OTSU
+    # learns the threshold and writes the 0/255 output in one fused pass, so
+    # splitting this into a threshold-learning call plus a separate compare
+    # would only add a full-image pass. The 0/255 range is what the OpenCV
+    # morphology/distance-transform calls downstream expect.
     threshold_value, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     print(f"Otsu's threshold value: {threshold_value}")
     
-    # Apply morphological operations to clean up the binary image
-    # First, remove small noise with erosion
-    kernel = np.ones((3, 3), np.uint8)
-    eroded = cv2.erode(binary, kernel, iterations=1)
-    
-    # Then dilate to restore nuclei size
-    dilated = cv2.dilate(eroded, kernel, iterations=1)
+    # Apply morphological operations to clean up the binary image:
+    # remove small noise with a single fused opening (erosion + dilation)
+    dilated = cv2.morphologyEx(binary, cv2.MORPH_OPEN, _K3,
+                               dst=scratch_buffer(binary.shape, np.uint8, 'open'))
     
-    # Apply distance transform for watershed segmentation
+    # Apply distance transform for watershed segmentation. distanceTransform
+    # returns float32 and the in-place normalize keeps it that way, so the
+    # whole peak-finding path runs at single precision; the old skimage
+    # watershed used to upcast a negated copy to float64.
     dist_transform = cv2.distanceTransform(dilated, cv2.DIST_L2, 5)
-    
+
     # Normalize the distance image for range = {0.0, 1.0}
     cv2.normalize(dist_transform, dist_transform, 0, 1.0, cv2.NORM_MINMAX)
     
-    # Find local maxima (markers) for watershed
-    coordinates = feature.peak_local_max(dist_transform, min_distance=7, labels=dilated)
-    
-    # Create a boolean mask of the same shape as the image
-    local_max = np.zeros_like(dist_transform, dtype=bool)
-    
-    # Mark the coordinates of local maxima as True
-    for coord in coordinates:
-        local_max[coord[0], coord[1]] = True
-    
-    # Label the markers
-    markers = measure.label(local_max)
-    
-    # Apply watershed segmentation
-    labels = segmentation.watershed(-dist_transform, markers, mask=dilated)
-    
-    # Count nuclei (number of regions)
-    nuclei_count = np.max(labels)
+    # Find local maxima (markers) for watershed: a pixel is a peak if it
+    # equals the maximum of its neighbourhood, found with one dilation
+    maxima = cv2.dilate(dist_transform, _PEAK_KERNEL,
+                        dst=scratch_buffer(dist_transform.shape, np.float32, 'maxima'))
+    local_max = (dist_transform == maxima) & (dilated > 0) & \
+                (dist_transform > dist_transform.mean() * 0.1)
+
+    # Label the markers. Peaks found by the dilate trick can be plateaus of
+    # several pixels, so one connected-components pass merges each plateau
+    # into a single marker; the bool mask is reinterpreted as uint8 in place
+    # rather than copied.
+    markers = cv2.connectedComponents(local_max.view(np.uint8), connectivity=8)[1]
+    
+    # Apply watershed segmentation with OpenCV's marker-based implementation.
+    # cv2.watershed floods the whole frame, so the background gets its own
+    # seed (label 1) and nucleus markers are shifted up by one; boundary
+    # pixels come back as -1 and are dropped with the background afterwards.
+    markers_cv = np.where(markers > 0, markers + 1, 0).astype(np.int32)
+    markers_cv[dilated == 0] = 1
+    cv2.watershed(cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR), markers_cv)
+    labels = np.where(markers_cv > 1, markers_cv - 1, 0)
+    
+    # Count nuclei (number of regions). cv2.watershed can absorb the odd
+    # seed entirely, so the marker count and the maximum label id both
+    # overcount; tally the labels that actually survived in one bincount
+    # pass instead of paying np.unique's sort.
+    nuclei_count = int(np.count_nonzero(np.bincount(labels.ravel())[1:]))
     
     if visualize:
         # Create visualization
         # Create a color-coded segmentation image
-        segmented_image = color.label2rgb(labels, image=image_rgb, bg_label=0)
-        
-        # Create figure for visualization
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-        
-        # Original image
-        axes[0, 0].imshow(image_rgb)
-        axes[0, 0].set_title('Original Image')
-        axes[0, 0].axis('off')
-        
-        # Blue channel
-        axes[0, 1].imshow(blue_channel, cmap='gray')
-        axes[0, 1].set_title('Blue Channel (Nuclei)')
-        axes[0, 1].axis('off')
-        
-        # Binary image after thresholding
-        axes[1, 0].imshow(dilated, cmap='gray')
-        axes[1, 0].set_title('Binary Image after Morphology')
-        axes[1, 0].axis('off')
-        
-        # Segmented nuclei
-        axes[1, 1].imshow(segmented_image)
-        axes[1, 1].set_title(f'Segmented Nuclei (Count: {nuclei_count})')
-        axes[1, 1].axis('off')
-        
-        plt.tight_layout()
-        
-        # Save visualization
+        segmented_image = fast_label2rgb(labels, image_rgb)
+
+        # Save the 2x2 panel grid, keeping the composed image for callers
         output_path = os.path.join(output_dir, 'nuclei_detection_results.png')
-        plt.savefig(output_path)
-        plt.close()
+        panel_image = save_panel(output_path, [
+            (image_rgb, 'Original Image'),
+            (blue_channel, 'Blue Channel (Nuclei)'),
+            (dilated, 'Binary Image after Morphology'),
+            (segmented_image, f'Segmented Nuclei (Count: {nuclei_count})'),
+        ])
         
         print(f"Detected {nuclei_count} nuclei")
         print(f"Saved visualization to {output_path}")
@@ -124,7 +133,8 @@ def detect_nuclei(image_path, output_dir=None, visualize=True):
     results = {
         'nuclei_count': int(nuclei_count),
         'threshold_value': float(threshold_value),
-        'labels': labels
+        'labels': labels,
+        'panel_image': panel_image if visualize else None
     }
     
     return results
@@ -2,26 +2,57 @@ import os
 import sys
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
-from skimage import measure, color
+from scipy import ndimage
+
+# Numba is an optional accelerator; fall back to plain NumPy without it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Import functions from other modules
 from nuclei_detection import detect_nuclei
 from myotube_detection import detect_myotubes
+from image_utils import fast_label2rgb, save_panel
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _classify_centroids(centroids, mask):
+        """Return a boolean array marking which centroids land on the mask."""
+        count = centroids.shape[0]
+        inside = np.empty(count, np.bool_)
+        height, width = mask.shape
+        for i in prange(count):
+            y = int(centroids[i, 0])
+            x = int(centroids[i, 1])
+            inside[i] = 0 <= y < height and 0 <= x < width and mask[y, x] > 0
+        return inside
+else:
+    def _classify_centroids(centroids, mask):
+        """Return a boolean array marking which centroids land on the mask."""
+        height, width = mask.shape
+        ys = np.clip(centroids[:, 0].astype(np.intp), 0, height - 1)
+        xs = np.clip(centroids[:, 1].astype(np.intp), 0, width - 1)
+        return mask[ys, xs] > 0
 
-def analyze_nuclei_myotube_relationship(image_path, output_dir=None, visualize=True):
+def analyze_nuclei_myotube_relationship(image_or_path, output_dir=None, visualize=True,
+                                        nuclei_results=None, myotube_results=None):
     """
     Analyze the relationship between nuclei and myotubes in a fluorescence microscopy image.
-    
+
     Parameters:
     -----------
-    image_path : str
-        Path to the input image
+    image_or_path : str or numpy.ndarray
+        Path to the input image, or an already decoded RGB image array
     output_dir : str, optional
         Directory to save output images and results
     visualize : bool, optional
         Whether to create and save visualization
-        
+    nuclei_results : dict, optional
+        Precomputed results from detect_nuclei; detection is re-run if omitted
+    myotube_results : dict, optional
+        Precomputed results from detect_myotubes; detection is re-run if omitted
+
     Returns:
     --------
     dict
@@ -29,63 +60,54 @@ def analyze_nuclei_myotube_relationship(image_path, output_dir=None, visualize=T
     """
     # Create output directory if it doesn't exist
     if output_dir is None:
-        output_dir = os.path.dirname(image_path)
-    
+        output_dir = os.path.dirname(image_or_path) if isinstance(image_or_path, str) else "results"
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
-    # Load the image
-    print(f"Loading image: {image_path}")
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Could not load image from {image_path}")
-    
-    # Convert from BGR to RGB for visualization
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Detect nuclei
-    print("Detecting nuclei...")
-    nuclei_results = detect_nuclei(image_path, output_dir, visualize=False)
-    
-    # Detect myotubes
-    print("Detecting myotubes...")
-    myotube_results = detect_myotubes(image_path, output_dir, visualize=False)
+
+    # Load the image (or reuse an already decoded RGB array)
+    if isinstance(image_or_path, np.ndarray):
+        image_rgb = image_or_path
+    else:
+        print(f"Loading image: {image_or_path}")
+        image = cv2.imread(image_or_path)
+        if image is None:
+            raise ValueError(f"Could not load image from {image_or_path}")
+
+        # Convert from BGR to RGB for visualization
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # Detect nuclei (unless precomputed results were passed in); pass the
+    # decoded array along so each detector skips its own decode
+    if nuclei_results is None:
+        print("Detecting nuclei...")
+        nuclei_results = detect_nuclei(image_rgb, output_dir, visualize=False)
+
+    # Detect myotubes (unless precomputed results were passed in)
+    if myotube_results is None:
+        print("Detecting myotubes...")
+        myotube_results = detect_myotubes(image_rgb, output_dir, visualize=False)
     
     # Get nuclei labels and myotube mask
     nuclei_labels = nuclei_results['labels']
     myotube_mask = myotube_results['myotube_mask']
     labeled_myotubes = myotube_results['labeled_myotubes']
     
-    # Count nuclei within myotubes
-    nuclei_within_myotubes = 0
-    nuclei_outside_myotubes = 0
-    
-    # Get unique nuclei labels (excluding background)
-    unique_nuclei = np.unique(nuclei_labels)
-    unique_nuclei = unique_nuclei[unique_nuclei > 0]  # Exclude background (0)
-    
-    # For each nucleus, check if it's within a myotube
-    nuclei_centroids = []
-    nuclei_in_myotube = []
-    
-    for nucleus_label in unique_nuclei:
-        # Get the region properties for this nucleus
-        nucleus_mask = nuclei_labels == nucleus_label
-        nucleus_props = measure.regionprops(nucleus_mask.astype(int))
-        
-        if nucleus_props:
-            # Get centroid of the nucleus
-            centroid = nucleus_props[0].centroid
-            nuclei_centroids.append(centroid)
-            
-            # Check if the centroid is within a myotube
-            y, x = int(centroid[0]), int(centroid[1])
-            if y < myotube_mask.shape[0] and x < myotube_mask.shape[1] and myotube_mask[y, x] > 0:
-                nuclei_within_myotubes += 1
-                nuclei_in_myotube.append(True)
-            else:
-                nuclei_outside_myotubes += 1
-                nuclei_in_myotube.append(False)
+    # Get the nuclei labels present in the image (excluding background 0)
+    # with one bincount pass instead of np.unique's sort
+    label_counts = np.bincount(nuclei_labels.ravel())
+    unique_nuclei = np.nonzero(label_counts[1:])[0] + 1
+
+    # Compute all nucleus centroids in one pass over the label image
+    nuclei_centroids = ndimage.center_of_mass(nuclei_labels > 0, nuclei_labels, index=unique_nuclei)
+
+    # Check which centroids fall within a myotube with a single mask lookup
+    centroids_arr = np.asarray(nuclei_centroids, dtype=np.float64).reshape(-1, 2)
+    inside = _classify_centroids(centroids_arr, myotube_mask)
+
+    nuclei_in_myotube = inside.tolist()
+    nuclei_within_myotubes = int(inside.sum())
+    nuclei_outside_myotubes = len(nuclei_centroids) - nuclei_within_myotubes
     
     # Calculate percentage of nuclei within myotubes
     total_nuclei = nuclei_within_myotubes + nuclei_outside_myotubes
@@ -95,56 +117,32 @@ def analyze_nuclei_myotube_relationship(image_path, output_dir=None, visualize=T
         # Create visualization
         # Create a color-coded image showing nuclei and myotubes
         # Blue for nuclei outside myotubes, green for nuclei within myotubes, red for myotubes
+        # A per-label LUT paints every nucleus region in one fancy-indexed
+        # scatter instead of drawing markers nucleus by nucleus
+        lut = np.zeros((int(nuclei_labels.max()) + 1, 3), np.uint8)
+        lut[unique_nuclei[inside]] = (0, 255, 0)
+        lut[unique_nuclei[~inside]] = (0, 0, 255)
+
         visualization = np.zeros((*image_rgb.shape[:2], 3), dtype=np.uint8)
-        
-        # Add myotubes in red
+
+        # Add myotubes in red, then the coloured nuclei on top
         visualization[myotube_mask > 0, 0] = 255  # Red channel
+        nucleus_pixels = nuclei_labels > 0
+        visualization[nucleus_pixels] = lut[nuclei_labels[nucleus_pixels]]
         
-        # Add nuclei
-        for i, centroid in enumerate(nuclei_centroids):
-            y, x = int(centroid[0]), int(centroid[1])
-            if y < visualization.shape[0] and x < visualization.shape[1]:
-                # Draw a circle at the nucleus centroid
-                if nuclei_in_myotube[i]:
-                    # Green for nuclei within myotubes
-                    cv2.circle(visualization, (x, y), 5, (0, 255, 0), -1)
-                else:
-                    # Blue for nuclei outside myotubes
-                    cv2.circle(visualization, (x, y), 5, (0, 0, 255), -1)
-        
-        # Create figure for visualization
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-        
-        # Original image
-        axes[0, 0].imshow(image_rgb)
-        axes[0, 0].set_title('Original Image')
-        axes[0, 0].axis('off')
-        
-        # Nuclei detection
-        nuclei_vis = color.label2rgb(nuclei_labels, image=image_rgb, bg_label=0)
-        axes[0, 1].imshow(nuclei_vis)
-        axes[0, 1].set_title(f'Nuclei Detection (Count: {total_nuclei})')
-        axes[0, 1].axis('off')
-        
-        # Myotube detection
-        myotube_vis = color.label2rgb(labeled_myotubes, image=image_rgb, bg_label=0, alpha=0.5)
-        axes[1, 0].imshow(myotube_vis)
-        axes[1, 0].set_title(f'Myotube Detection (Count: {myotube_results["myotube_count"]})')
-        axes[1, 0].axis('off')
-        
-        # Relationship visualization
-        axes[1, 1].imshow(visualization)
-        axes[1, 1].set_title(f'Nuclei-Myotube Relationship\n'
-                           f'Within: {nuclei_within_myotubes} ({percentage_within_myotubes:.2f}%)\n'
-                           f'Outside: {nuclei_outside_myotubes} ({100-percentage_within_myotubes:.2f}%)')
-        axes[1, 1].axis('off')
-        
-        plt.tight_layout()
-        
-        # Save visualization
+        # Save the 2x2 panel grid
+        nuclei_vis = fast_label2rgb(nuclei_labels, image_rgb)
+        myotube_vis = fast_label2rgb(labeled_myotubes, image_rgb, alpha=0.5)
+
         output_path = os.path.join(output_dir, 'nuclei_myotube_relationship.png')
-        plt.savefig(output_path)
-        plt.close()
+        panel_image = save_panel(output_path, [
+            (image_rgb, 'Original Image'),
+            (nuclei_vis, f'Nuclei Detection (Count: {total_nuclei})'),
+            (myotube_vis, f'Myotube Detection (Count: {myotube_results["myotube_count"]})'),
+            (visualization, f'Nuclei-Myotube Relationship\n'
+                            f'Within: {nuclei_within_myotubes} ({percentage_within_myotubes:.2f}%)\n'
+                            f'Outside: {nuclei_outside_myotubes} ({100-percentage_within_myotubes:.2f}%)'),
+        ])
         
         print(f"Total nuclei: {total_nuclei}")
         print(f"Nuclei within myotubes: {nuclei_within_myotubes} ({percentage_within_myotubes:.2f}%)")
@@ -160,7 +158,8 @@ def analyze_nuclei_myotube_relationship(image_path, output_dir=None, visualize=T
         'myotube_count': int(myotube_results['myotube_count']),
         'myotube_area_percentage': float(myotube_results['myotube_area_percentage']),
         'nuclei_centroids': nuclei_centroids,
-        'nuclei_in_myotube': nuclei_in_myotube
+        'nuclei_in_myotube': nuclei_in_myotube,
+        'panel_image': panel_image if visualize else None
     }
     
     return results
@@ -1,9 +1,8 @@
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
-from skimage import measure, color
 
 # Import functions from other modules
 from nuclei_detection import detect_nuclei
@@ -31,28 +30,41 @@ def test_analysis_pipeline(image_path, output_dir=None):
     
     print(f"Testing analysis pipeline on image: {image_path}")
     print(f"Results will be saved to: {output_dir}")
-    
-    # Step 1: Detect nuclei
-    print("\nStep 1: Detecting nuclei...")
-    nuclei_results = detect_nuclei(image_path, output_dir, visualize=True)
+
+    # Decode the image once and hand the RGB array through the pipeline
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Could not load image from {image_path}")
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # Steps 1 and 2: the two detections share no state, so run them in
+    # parallel worker processes
+    print("\nSteps 1 and 2: Detecting nuclei and myotubes in parallel...")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        nuclei_future = executor.submit(detect_nuclei, image_rgb, output_dir, True)
+        myotube_future = executor.submit(detect_myotubes, image_rgb, output_dir, True)
+        nuclei_results = nuclei_future.result()
+        myotube_results = myotube_future.result()
     print(f"Detected {nuclei_results['nuclei_count']} nuclei")
-    
-    # Step 2: Detect myotubes
-    print("\nStep 2: Detecting myotubes...")
-    myotube_results = detect_myotubes(image_path, output_dir, visualize=True)
     print(f"Detected {myotube_results['myotube_count']} myotube regions")
     print(f"Myotube area: {myotube_results['myotube_area_percentage']:.2f}% of image")
     
-    # Step 3: Analyze relationship
+    # Step 3: Analyze relationship (reusing the detection results from steps 1 and 2)
     print("\nStep 3: Analyzing nuclei-myotube relationship...")
-    relationship_results = analyze_nuclei_myotube_relationship(image_path, output_dir, visualize=True)
+    relationship_results = analyze_nuclei_myotube_relationship(image_rgb, output_dir, visualize=True,
+                                                               nuclei_results=nuclei_results,
+                                                               myotube_results=myotube_results)
     print(f"Total nuclei: {relationship_results['total_nuclei']}")
     print(f"Nuclei within myotubes: {relationship_results['nuclei_within_myotubes']} ({relationship_results['percentage_within_myotubes']:.2f}%)")
     print(f"Nuclei outside myotubes: {relationship_results['nuclei_outside_myotubes']} ({100-relationship_results['percentage_within_myotubes']:.2f}%)")
     
-    # Step 4: Create enhanced visualization
+    # Step 4: Create enhanced visualization from the in-memory panels
     print("\nStep 4: Creating enhanced visualization...")
-    enhanced_vis_path = create_enhanced_visualization(image_path, relationship_results, output_dir)
+    enhanced_vis_path = create_enhanced_visualization(
+        image_path, relationship_results, output_dir,
+        panels=(nuclei_results['panel_image'],
+                myotube_results['panel_image'],
+                relationship_results['panel_image']))
     
     # Step 5: Generate reports
     print("\nStep 5: Generating reports...")
@@ -1,22 +1,54 @@
 import os
+import string
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
-from skimage import measure, color
-import csv
 import datetime
 import json
 
+# orjson is an optional fast JSON encoder; fall back to the stdlib without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import functions from other modules
 from nuclei_detection import detect_nuclei
 from myotube_detection import detect_myotubes
 from nuclei_myotube_relationship import analyze_nuclei_myotube_relationship
+from image_utils import save_panel
+
+def _ensure_dir(path):
+    """Create the output directory if needed. exist_ok makes this one cheap
+    mkdir syscall instead of a stat-then-mkdir pair, and keeps it safe when
+    the report writers run in parallel threads."""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+@lru_cache(maxsize=8)
+def _read_png_cached(path, mtime):
+    array = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if array is None:
+        raise ValueError(f"Could not load image from {path}")
+    if array.ndim == 3 and array.shape[2] == 3:
+        return cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+    if array.ndim == 3 and array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_BGRA2RGBA)
+    return array
+
+def _read_png(path):
+    """Decode a sub-panel PNG with OpenCV, staying in uint8 instead of
+    matplotlib's float32-in-[0,1] representation (4x the bytes). The cached
+    array is reused while the file is unchanged; the mtime in the cache key
+    drops stale entries when a panel is regenerated."""
+    return _read_png_cached(path, os.path.getmtime(path))
 
-def create_enhanced_visualization(image_path, results, output_dir=None):
+def create_enhanced_visualization(image_path, results, output_dir=None, panels=None):
     """
     Create enhanced visualization of the analysis results.
-    
+
     Parameters:
     -----------
     image_path : str
@@ -25,7 +57,10 @@ def create_enhanced_visualization(image_path, results, output_dir=None):
         Dictionary containing analysis results
     output_dir : str, optional
         Directory to save output images and results
-        
+    panels : tuple of numpy.ndarray, optional
+        (nuclei, myotube, relationship) panel images already in memory;
+        any panel given here skips its PNG round-trip through disk
+
     Returns:
     --------
     str
@@ -34,9 +69,8 @@ def create_enhanced_visualization(image_path, results, output_dir=None):
     # Create output directory if it doesn't exist
     if output_dir is None:
         output_dir = os.path.dirname(image_path)
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+
+    _ensure_dir(output_dir)
     
     # Load the image
     image = cv2.imread(image_path)
@@ -46,80 +80,65 @@ def create_enhanced_visualization(image_path, results, output_dir=None):
     # Convert from BGR to RGB for visualization
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     
-    # Create figure for visualization
-    fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-    
-    # Original image
-    axes[0, 0].imshow(image_rgb)
-    axes[0, 0].set_title('Original Image', fontsize=14)
-    axes[0, 0].axis('off')
-    
-    # Nuclei visualization
-    nuclei_vis = plt.imread(os.path.join(output_dir, 'nuclei_detection_results.png'))
-    axes[0, 1].imshow(nuclei_vis)
-    axes[0, 1].set_title(f'Nuclei Detection (Count: {results["total_nuclei"]})', fontsize=14)
-    axes[0, 1].axis('off')
-    
-    # Myotube visualization
-    myotube_vis = plt.imread(os.path.join(output_dir, 'myotube_detection_results.png'))
-    axes[1, 0].imshow(myotube_vis)
-    axes[1, 0].set_title(f'Myotube Detection (Count: {results["myotube_count"]})', fontsize=14)
-    axes[1, 0].axis('off')
-    
-    # Relationship visualization
-    relationship_vis = plt.imread(os.path.join(output_dir, 'nuclei_myotube_relationship.png'))
-    axes[1, 1].imshow(relationship_vis)
-    axes[1, 1].set_title('Nuclei-Myotube Relationship', fontsize=14)
-    axes[1, 1].axis('off')
-    
-    # Add summary text
-    plt.figtext(0.5, 0.01, 
-                f'Summary: {results["total_nuclei"]} nuclei detected, {results["percentage_within_myotubes"]:.2f}% within myotubes. '
-                f'Myotube area: {results["myotube_area_percentage"]:.2f}% of image.',
-                ha='center', fontsize=14, bbox={'facecolor':'white', 'alpha':0.8, 'pad':5})
-    
-    plt.tight_layout(rect=[0, 0.03, 1, 0.97])
-    
-    # Save visualization
+    if panels is None:
+        panels = (None, None, None)
+
+    nuclei_vis = panels[0] if panels[0] is not None else \
+        _read_png(os.path.join(output_dir, 'nuclei_detection_results.png'))
+    myotube_vis = panels[1] if panels[1] is not None else \
+        _read_png(os.path.join(output_dir, 'myotube_detection_results.png'))
+    relationship_vis = panels[2] if panels[2] is not None else \
+        _read_png(os.path.join(output_dir, 'nuclei_myotube_relationship.png'))
+
+    # Stitch the composite directly with OpenCV: four tiles, titles and the
+    # summary footer are plain raster work, so the whole matplotlib
+    # figure/renderer pipeline is unnecessary. This also means there is no
+    # per-call Figure/Axes object graph to pool and fig.clear() between
+    # batch images; the only allocations left are the concat outputs, which
+    # are handed back to the caller. save_panel downsamples each
+    # source panel to the tile size with INTER_AREA before compositing, so
+    # encode cost scales with the output resolution, not the source
+    # resolution, even for full-camera-size inputs. Minimal PNG compression
+    # keeps the encode fast.
     output_path = os.path.join(output_dir, 'enhanced_visualization.png')
-    plt.savefig(output_path, dpi=150)
-    plt.close()
-    
+    save_panel(output_path, [
+        (image_rgb, 'Original Image'),
+        (nuclei_vis, f'Nuclei Detection (Count: {results["total_nuclei"]})'),
+        (myotube_vis, f'Myotube Detection (Count: {results["myotube_count"]})'),
+        (relationship_vis, 'Nuclei-Myotube Relationship'),
+    ], tile_size=(1050, 900),
+       footer=f'Summary: {results["total_nuclei"]} nuclei detected, '
+              f'{results["percentage_within_myotubes"]:.2f}% within myotubes. '
+              f'Myotube area: {results["myotube_area_percentage"]:.2f}% of image.',
+       compression=1)
+
     print(f"Saved enhanced visualization to {output_path}")
-    
+
     return output_path
 
-def generate_html_report(image_path, results, output_dir=None):
+def _format_results(results):
     """
-    Generate an HTML report of the analysis results.
-    
-    Parameters:
-    -----------
-    image_path : str
-        Path to the input image
-    results : dict
-        Dictionary containing analysis results
-    output_dir : str, optional
-        Directory to save output report
-        
-    Returns:
-    --------
-    str
-        Path to the saved HTML report
+    Format the numeric result fields once for reuse across report writers.
+
+    The HTML and CSV reports render the same counts and percentages; doing
+    the casts and the :.2f formatting here keeps each format spec from
+    being re-interpreted per writer (and per image in batch runs).
     """
-    # Create output directory if it doesn't exist
-    if output_dir is None:
-        output_dir = os.path.dirname(image_path)
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    # Get current date and time
-    now = datetime.datetime.now()
-    date_str = now.strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Create HTML content
-    html_content = f"""
+    return {
+        'total_nuclei': int(results["total_nuclei"]),
+        'nuclei_within': int(results["nuclei_within_myotubes"]),
+        'nuclei_outside': int(results["nuclei_outside_myotubes"]),
+        'pct_in': f'{results["percentage_within_myotubes"]:.2f}',
+        'pct_out': f'{100 - results["percentage_within_myotubes"]:.2f}',
+        'myotube_count': int(results["myotube_count"]),
+        'myotube_area_pct': f'{results["myotube_area_percentage"]:.2f}',
+    }
+
+# HTML report skeleton, parsed once at import. The static head (markup and
+# CSS) and tail (visualization gallery and footer) are plain constants;
+# only the middle section carries dynamic values, so the per-call template
+# scan covers just that slice and the pieces are joined in one shot.
+_HTML_HEAD = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -127,88 +146,91 @@ def generate_html_report(image_path, results, output_dir=None):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Myotube Analysis Report</title>
         <style>
-            body {{
+            body {
                 font-family: Arial, sans-serif;
                 line-height: 1.6;
                 margin: 0;
                 padding: 20px;
                 color: #333;
-            }}
-            .container {{
+            }
+            .container {
                 max-width: 1200px;
                 margin: 0 auto;
-            }}
-            h1, h2, h3 {{
+            }
+            h1, h2, h3 {
                 color: #2c3e50;
-            }}
-            .header {{
+            }
+            .header {
                 text-align: center;
                 margin-bottom: 30px;
                 padding-bottom: 20px;
                 border-bottom: 1px solid #eee;
-            }}
-            .results-summary {{
+            }
+            .results-summary {
                 background-color: #f8f9fa;
                 padding: 20px;
                 border-radius: 5px;
                 margin-bottom: 30px;
-            }}
-            .results-table {{
+            }
+            .results-table {
                 width: 100%;
                 border-collapse: collapse;
                 margin-bottom: 30px;
-            }}
-            .results-table th, .results-table td {{
+            }
+            .results-table th, .results-table td {
                 padding: 12px 15px;
                 border: 1px solid #ddd;
                 text-align: left;
-            }}
-            .results-table th {{
+            }
+            .results-table th {
                 background-color: #f2f2f2;
-            }}
-            .results-table tr:nth-child(even) {{
+            }
+            .results-table tr:nth-child(even) {
                 background-color: #f8f8f8;
-            }}
-            .visualization {{
+            }
+            .visualization {
                 margin-bottom: 30px;
                 text-align: center;
-            }}
-            .visualization img {{
+            }
+            .visualization img {
                 max-width: 100%;
                 height: auto;
                 border: 1px solid #ddd;
                 border-radius: 5px;
-            }}
-            .footer {{
+            }
+            .footer {
                 margin-top: 50px;
                 padding-top: 20px;
                 border-top: 1px solid #eee;
                 text-align: center;
                 font-size: 0.9em;
                 color: #777;
-            }}
+            }
         </style>
     </head>
     <body>
         <div class="container">
+"""
+
+_HTML_DYNAMIC = string.Template("""\
             <div class="header">
                 <h1>Myotube Analysis Report</h1>
-                <p>Analysis performed on: {date_str}</p>
-                <p>Image: {os.path.basename(image_path)}</p>
+                <p>Analysis performed on: $date</p>
+                <p>Image: $image_name</p>
             </div>
-            
+
             <div class="results-summary">
                 <h2>Analysis Summary</h2>
                 <p>This report presents the results of automated analysis of myotubes and nuclei in the provided microscopy image.</p>
                 <ul>
-                    <li><strong>Total nuclei detected:</strong> {results["total_nuclei"]}</li>
-                    <li><strong>Nuclei within myotubes:</strong> {results["nuclei_within_myotubes"]} ({results["percentage_within_myotubes"]:.2f}%)</li>
-                    <li><strong>Nuclei outside myotubes:</strong> {results["nuclei_outside_myotubes"]} ({100-results["percentage_within_myotubes"]:.2f}%)</li>
-                    <li><strong>Myotube count:</strong> {results["myotube_count"]}</li>
-                    <li><strong>Myotube area:</strong> {results["myotube_area_percentage"]:.2f}% of image area</li>
+                    <li><strong>Total nuclei detected:</strong> $total_nuclei</li>
+                    <li><strong>Nuclei within myotubes:</strong> $nuclei_within ($pct_in%)</li>
+                    <li><strong>Nuclei outside myotubes:</strong> $nuclei_outside ($pct_out%)</li>
+                    <li><strong>Myotube count:</strong> $myotube_count</li>
+                    <li><strong>Myotube area:</strong> $myotube_area_pct% of image area</li>
                 </ul>
             </div>
-            
+
             <h2>Detailed Results</h2>
             <table class="results-table">
                 <tr>
@@ -218,62 +240,64 @@ def generate_html_report(image_path, results, output_dir=None):
                 </tr>
                 <tr>
                     <td>Total nuclei</td>
-                    <td>{results["total_nuclei"]}</td>
+                    <td>$total_nuclei</td>
                     <td>Total number of nuclei detected in the image</td>
                 </tr>
                 <tr>
                     <td>Nuclei within myotubes</td>
-                    <td>{results["nuclei_within_myotubes"]}</td>
+                    <td>$nuclei_within</td>
                     <td>Number of nuclei located within myotube regions</td>
                 </tr>
                 <tr>
                     <td>Nuclei outside myotubes</td>
-                    <td>{results["nuclei_outside_myotubes"]}</td>
+                    <td>$nuclei_outside</td>
                     <td>Number of nuclei located outside myotube regions</td>
                 </tr>
                 <tr>
                     <td>Percentage within myotubes</td>
-                    <td>{results["percentage_within_myotubes"]:.2f}%</td>
+                    <td>$pct_in%</td>
                     <td>Percentage of nuclei located within myotube regions</td>
                 </tr>
                 <tr>
                     <td>Myotube count</td>
-                    <td>{results["myotube_count"]}</td>
+                    <td>$myotube_count</td>
                     <td>Number of distinct myotube regions detected</td>
                 </tr>
                 <tr>
                     <td>Myotube area percentage</td>
-                    <td>{results["myotube_area_percentage"]:.2f}%</td>
+                    <td>$myotube_area_pct%</td>
                     <td>Percentage of image area covered by myotubes</td>
                 </tr>
             </table>
-            
+""")
+
+_HTML_TAIL = """
             <h2>Visualizations</h2>
-            
+
             <div class="visualization">
                 <h3>Enhanced Visualization</h3>
                 <img src="enhanced_visualization.png" alt="Enhanced Visualization">
                 <p>Comprehensive visualization showing original image, nuclei detection, myotube detection, and their relationship.</p>
             </div>
-            
+
             <div class="visualization">
                 <h3>Nuclei Detection</h3>
                 <img src="nuclei_detection_results.png" alt="Nuclei Detection">
                 <p>Visualization of the nuclei detection process and results.</p>
             </div>
-            
+
             <div class="visualization">
                 <h3>Myotube Detection</h3>
                 <img src="myotube_detection_results.png" alt="Myotube Detection">
                 <p>Visualization of the myotube detection process and results.</p>
             </div>
-            
+
             <div class="visualization">
                 <h3>Nuclei-Myotube Relationship</h3>
                 <img src="nuclei_myotube_relationship.png" alt="Nuclei-Myotube Relationship">
                 <p>Visualization showing the spatial relationship between nuclei and myotubes.</p>
             </div>
-            
+
             <div class="footer">
                 <p>This report was generated automatically by the Myotube Analyzer tool.</p>
                 <p>© 2025 Myotube Analyzer</p>
@@ -282,57 +306,124 @@ def generate_html_report(image_path, results, output_dir=None):
     </body>
     </html>
     """
+
+def generate_html_report(image_path, results, output_dir=None, formatted=None):
+    """
+    Generate an HTML report of the analysis results.
+
+    Parameters:
+    -----------
+    image_path : str
+        Path to the input image
+    results : dict
+        Dictionary containing analysis results
+    output_dir : str, optional
+        Directory to save output report
+    formatted : dict, optional
+        Shared output of _format_results; computed here if omitted
+
+    Returns:
+    --------
+    str
+        Path to the saved HTML report
+    """
+    # Create output directory if it doesn't exist
+    if output_dir is None:
+        output_dir = os.path.dirname(image_path)
+
+    _ensure_dir(output_dir)
     
-    # Save HTML report
+    # Get current date and time
+    now = datetime.datetime.now()
+    date_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    
+    # Render the cached template from the shared formatted values
+    if formatted is None:
+        formatted = _format_results(results)
+    html_content = ''.join((
+        _HTML_HEAD,
+        _HTML_DYNAMIC.substitute(formatted, date=date_str,
+                                 image_name=os.path.basename(image_path)),
+        _HTML_TAIL,
+    ))
+
+    # Save HTML report in one buffered write, going through a temp file and
+    # an atomic rename so concurrent readers never see a half-written report
     output_path = os.path.join(output_dir, 'myotube_analysis_report.html')
-    with open(output_path, 'w') as f:
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', buffering=1 << 16) as f:
         f.write(html_content)
+    os.replace(tmp_path, output_path)
     
     print(f"Saved HTML report to {output_path}")
     
     return output_path
 
-def generate_csv_report(results, output_dir):
+def generate_csv_report(results, output_dir, formatted=None):
     """
     Generate a CSV report of the analysis results.
-    
+
     Parameters:
     -----------
     results : dict
         Dictionary containing analysis results
     output_dir : str
         Directory to save output report
-        
+    formatted : dict, optional
+        Shared output of _format_results; computed here if omitted
+
     Returns:
     --------
     str
         Path to the saved CSV report
     """
     # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    _ensure_dir(output_dir)
     
-    # Prepare data for CSV
+    # Prepare data for CSV from the shared formatted values
+    if formatted is None:
+        formatted = _format_results(results)
+
     data = [
         ['Metric', 'Value', 'Description'],
-        ['Total nuclei', results["total_nuclei"], 'Total number of nuclei detected in the image'],
-        ['Nuclei within myotubes', results["nuclei_within_myotubes"], 'Number of nuclei located within myotube regions'],
-        ['Nuclei outside myotubes', results["nuclei_outside_myotubes"], 'Number of nuclei located outside myotube regions'],
-        ['Percentage within myotubes', f"{results['percentage_within_myotubes']:.2f}%", 'Percentage of nuclei located within myotube regions'],
-        ['Myotube count', results["myotube_count"], 'Number of distinct myotube regions detected'],
-        ['Myotube area percentage', f"{results['myotube_area_percentage']:.2f}%", 'Percentage of image area covered by myotubes']
+        ['Total nuclei', formatted['total_nuclei'], 'Total number of nuclei detected in the image'],
+        ['Nuclei within myotubes', formatted['nuclei_within'], 'Number of nuclei located within myotube regions'],
+        ['Nuclei outside myotubes', formatted['nuclei_outside'], 'Number of nuclei located outside myotube regions'],
+        ['Percentage within myotubes', f"{formatted['pct_in']}%", 'Percentage of nuclei located within myotube regions'],
+        ['Myotube count', formatted['myotube_count'], 'Number of distinct myotube regions detected'],
+        ['Myotube area percentage', f"{formatted['myotube_area_pct']}%", 'Percentage of image area covered by myotubes']
     ]
     
-    # Save CSV report
+    # Save CSV report. The schema is fixed and no field contains commas or
+    # quotes (guarded below), so the csv module's per-field quoting pass is
+    # unnecessary: pre-join the whole report and write it in one shot,
+    # keeping csv.writer's \r\n line endings.
+    assert all(',' not in str(field) and '"' not in str(field)
+               for row in data for field in row)
+    buffer = '\r\n'.join(','.join(str(field) for field in row) for row in data) + '\r\n'
+
+    # Temp file plus atomic rename keeps concurrent readers off torn files
     output_path = os.path.join(output_dir, 'myotube_analysis_results.csv')
-    with open(output_path, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerows(data)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', newline='', buffering=1 << 16) as f:
+        f.write(buffer)
+    os.replace(tmp_path, output_path)
     
     print(f"Saved CSV report to {output_path}")
     
     return output_path
 
+# Numeric result fields carried into the JSON report, with the native type
+# each one is coerced back to after the bulk ndarray conversion
+_JSON_FIELDS = (
+    ('total_nuclei', int),
+    ('nuclei_within_myotubes', int),
+    ('nuclei_outside_myotubes', int),
+    ('percentage_within_myotubes', float),
+    ('myotube_count', int),
+    ('myotube_area_percentage', float),
+)
+
 def generate_json_report(results, output_dir):
     """
     Generate a JSON report of the analysis results.
@@ -350,25 +441,30 @@ def generate_json_report(results, output_dir):
         Path to the saved JSON report
     """
     # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    _ensure_dir(output_dir)
     
     # Prepare data for JSON
-    # Remove non-serializable data (like numpy arrays)
-    json_results = {
-        'total_nuclei': int(results["total_nuclei"]),
-        'nuclei_within_myotubes': int(results["nuclei_within_myotubes"]),
-        'nuclei_outside_myotubes': int(results["nuclei_outside_myotubes"]),
-        'percentage_within_myotubes': float(results["percentage_within_myotubes"]),
-        'myotube_count': int(results["myotube_count"]),
-        'myotube_area_percentage': float(results["myotube_area_percentage"]),
-        'timestamp': datetime.datetime.now().isoformat()
-    }
-    
-    # Save JSON report
+    # Remove non-serializable data (like numpy arrays): the numeric fields
+    # go through one ndarray round-trip, which converts any numpy scalars to
+    # native Python floats in a single C pass instead of per-field casts
+    values = np.array([results[name] for name, _ in _JSON_FIELDS],
+                      dtype=np.float64).tolist()
+    json_results = {name: cast(value)
+                    for (name, cast), value in zip(_JSON_FIELDS, values)}
+    json_results['timestamp'] = datetime.datetime.now().isoformat()
+    
+    # Save JSON report. Serialize to one buffer first so the file sees a
+    # single write(); orjson's C encoder is used when available. The temp
+    # file plus atomic rename keeps concurrent readers off torn files.
     output_path = os.path.join(output_dir, 'myotube_analysis_results.json')
-    with open(output_path, 'w') as f:
-        json.dump(json_results, f, indent=4)
+    tmp_path = output_path + '.tmp'
+    if orjson is not None:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(json_results, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(json_results, indent=4))
+    os.replace(tmp_path, output_path)
     
     print(f"Saved JSON report to {output_path}")
     
@@ -391,23 +487,46 @@ if __name__ == "__main__":
     
     # Run the complete analysis pipeline
     print(f"Analyzing image: {image_path}")
-    
+
+    # Decode the image once and hand the RGB array through the pipeline
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Could not load image from {image_path}")
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
     # Detect nuclei
-    nuclei_results = detect_nuclei(image_path, output_dir)
-    
+    nuclei_results = detect_nuclei(image_rgb, output_dir)
+
     # Detect myotubes
-    myotube_results = detect_myotubes(image_path, output_dir)
-    
-    # Analyze relationship
-    relationship_results = analyze_nuclei_myotube_relationship(image_path, output_dir)
-    
-    # Create enhanced visualization
-    enhanced_vis_path = create_enhanced_visualization(image_path, relationship_results, output_dir)
+    myotube_results = detect_myotubes(image_rgb, output_dir)
+
+    # Analyze relationship (reusing the detection results computed above)
+    relationship_results = analyze_nuclei_myotube_relationship(image_rgb, output_dir,
+                                                               nuclei_results=nuclei_results,
+                                                               myotube_results=myotube_results)
     
-    # Generate reports
-    html_report_path = generate_html_report(image_path, relationship_results, output_dir)
-    csv_report_path = generate_csv_report(relationship_results, output_dir)
-    json_report_path = generate_json_report(relationship_results, output_dir)
+    # Format the shared report values once for all writers
+    formatted_results = _format_results(relationship_results)
+
+    # Create the enhanced visualization and the three reports in parallel:
+    # they all read relationship_results and write distinct files, and the
+    # PNG encode and file I/O release the GIL
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        vis_future = executor.submit(
+            create_enhanced_visualization, image_path, relationship_results, output_dir,
+            (nuclei_results['panel_image'],
+             myotube_results['panel_image'],
+             relationship_results['panel_image']))
+        html_future = executor.submit(generate_html_report, image_path, relationship_results,
+                                      output_dir, formatted_results)
+        csv_future = executor.submit(generate_csv_report, relationship_results,
+                                     output_dir, formatted_results)
+        json_future = executor.submit(generate_json_report, relationship_results, output_dir)
+
+        enhanced_vis_path = vis_future.result()
+        html_report_path = html_future.result()
+        csv_report_path = csv_future.result()
+        json_report_path = json_future.result()
     
     print("\nAnalysis Summary:")
     print(f"Total nuclei: {relationship_results['total_nuclei']}")